@@ -18,23 +18,25 @@
 from __future__ import absolute_import
 
 import re
+from collections import Counter
 
-from typing import Dict, List
+from typing import Dict, List, Optional
 
 from pyfaf.opsys import System
 from pyfaf.checker import DictChecker, IntChecker, ListChecker, StringChecker
 from pyfaf.common import FafError, log
-from pyfaf.queries import (get_arch_by_name,
+from pyfaf.queries import (get_archs_by_names,
                            get_opsys_by_name,
-                           get_package_by_nevra,
-                           get_reportpackage,
-                           get_unknown_package)
+                           get_packages_by_nevras,
+                           get_reportpackages_bulk,
+                           get_unknown_packages_bulk)
 from pyfaf.storage import (Arch,
                            Build,
                            OpSys,
                            Package,
                            ReportPackage,
                            ReportUnknownPackage,
+                           YieldQueryAdaptor,
                            column_len)
 from pyfaf.repos import repo_types
 from pyfaf.utils.parse import str2bool, words2list
@@ -42,6 +44,11 @@ from pyfaf.storage.custom_types import to_semver
 
 __all__ = ["CentOS"]
 
+RELEASE_TOKEN_PARSER = re.compile(r"[\w\.]+")
+
+# uReport package role -> ReportPackage.type, anything else is "RELATED"
+PACKAGE_ROLE_TYPES = {"affected": "CRASHED", "selinux_policy": "SELINUX_POLICY"}
+
 # see https://github.com/abrt/faf/issues/695
 # pylint: disable=abstract-method
 
@@ -72,7 +79,7 @@ class CentOS(System):
         # "architecture":   StringChecker()
     })
 
-    pkg_roles = ["affected", "related", "selinux_policy"]
+    pkg_roles = frozenset(["affected", "related", "selinux_policy"])
 
     @classmethod
     def install(cls, db, logger=None) -> None:
@@ -92,80 +99,143 @@ class CentOS(System):
     def __init__(self) -> None:
         super().__init__()
         self.eol = None
-        self.repo_urls = []
-        self.allow_unpackaged = None
-        self.inactive_releases = None
-        self.active_releases = None
-        self.load_config_to_self("repo_urls", ["centos.repo-urls"], [],
+        self._repo_urls: List[str] = []
+        self._allow_unpackaged = False
+        self._inactive_releases: Optional[str] = None
+        self._active_releases: Optional[str] = None
+        self._inactive_release_list: List[str] = []
+        self._active_release_list: List[str] = []
+        # the configuration is only parsed once it is needed,
+        # see _load_config()
+        self._config_loaded = False
+
+    def _load_config(self) -> None:
+        if self._config_loaded:
+            return
+
+        self.load_config_to_self("_repo_urls", ["centos.repo-urls"], [],
                                  callback=words2list)
-        self.load_config_to_self("allow_unpackaged",
+        self.load_config_to_self("_allow_unpackaged",
                                  ["ureport.allow-unpackaged"], False,
                                  callback=str2bool)
-        self.load_config_to_self("inactive_releases", ["centos.inactive-releases"])
-        self.load_config_to_self("active_releases", ["centos.active-releases"])
-
-    def _save_packages(self, db, db_report, packages, count=1) -> None:
-        for package in packages:
-            role = "RELATED"
-            if "package_role" in package:
-                if package["package_role"] == "affected":
-                    role = "CRASHED"
-                elif package["package_role"] == "selinux_policy":
-                    role = "SELINUX_POLICY"
-
-            db_package = get_package_by_nevra(db,
-                                              name=package["name"],
-                                              epoch=package["epoch"],
-                                              version=package["version"],
-                                              release=package["release"],
-                                              arch=package["architecture"])
+        self.load_config_to_self("_inactive_releases", ["centos.inactive-releases"])
+        self.load_config_to_self("_active_releases", ["centos.active-releases"])
+
+        # the release lists never change after loading the configuration
+        self._inactive_release_list = RELEASE_TOKEN_PARSER.findall(
+            self._inactive_releases or "")
+        self._active_release_list = RELEASE_TOKEN_PARSER.findall(
+            self._active_releases or "")
+
+        self._config_loaded = True
+
+    @property
+    def repo_urls(self) -> List[str]:
+        self._load_config()
+        return self._repo_urls
+
+    @property
+    def allow_unpackaged(self) -> bool:
+        self._load_config()
+        return self._allow_unpackaged
+
+    @property
+    def inactive_releases(self) -> Optional[str]:
+        self._load_config()
+        return self._inactive_releases
+
+    @property
+    def active_releases(self) -> Optional[str]:
+        self._load_config()
+        return self._active_releases
+
+    def _save_packages(self, db, db_report, packages, count=1) -> bool:
+        """
+        Save the list of packages of a uReport. Return True if anything
+        was written, False otherwise.
+        """
+
+        if not packages:
+            return False
+
+        # identical packages are processed once with their counts summed up
+        occurrences = Counter(
+            (PACKAGE_ROLE_TYPES.get(package.get("package_role"), "RELATED"),
+             (package["name"], package["epoch"], package["version"],
+              package["release"], package["architecture"]))
+            for package in packages)
+        nevras = list({nevra for _, nevra in occurrences})
+
+        db_packages = get_packages_by_nevras(db, nevras)
+        db_reportpackages = get_reportpackages_bulk(
+            db, db_report, [db_package.id for db_package in db_packages.values()])
+        unknown_nevras = [nevra for nevra in nevras if nevra not in db_packages]
+        # architectures are only needed to create unknown packages
+        db_archs = get_archs_by_names(db, [nevra[4] for nevra in unknown_nevras])
+        db_unknown_pkgs = get_unknown_packages_bulk(db, db_report, unknown_nevras)
+        # only unknown packages without a row yet need the semantic versions,
+        # packages of the same build share version and release strings
+        semvers = {string: to_semver(string)
+                   for role, nevra in occurrences
+                   if nevra not in db_packages
+                   and (role,) + nevra not in db_unknown_pkgs
+                   for string in nevra[2:4]}
+
+        # rows created in this call, a package may be listed with several roles
+        new_reportpackages = {}
+        new_rows = []
+        changed = False
+        for (role, nevra), occurrence in occurrences.items():
+            name, epoch, version, release, arch = nevra
+            pkg_count = count * occurrence
+
+            db_package = db_packages.get(nevra)
             if db_package is None:
-                self.log_warn("Package {0}-{1}:{2}-{3}.{4} not found in "
-                              "storage".format(package["name"],
-                                               package["epoch"],
-                                               package["version"],
-                                               package["release"],
-                                               package["architecture"]))
-
-                db_unknown_pkg = get_unknown_package(db,
-                                                     db_report,
-                                                     role,
-                                                     package["name"],
-                                                     package["epoch"],
-                                                     package["version"],
-                                                     package["release"],
-                                                     package["architecture"])
+                self.log_warn("Package %s-%s:%s-%s.%s not found in storage",
+                              name, epoch, version, release, arch)
+
+                db_unknown_pkg = db_unknown_pkgs.get((role,) + nevra)
                 if db_unknown_pkg is None:
-                    db_arch = get_arch_by_name(db, package["architecture"])
+                    db_arch = db_archs.get(arch)
                     if db_arch is None:
                         continue
 
                     db_unknown_pkg = ReportUnknownPackage()
                     db_unknown_pkg.report = db_report
-                    db_unknown_pkg.name = package["name"]
-                    db_unknown_pkg.epoch = package["epoch"]
-                    db_unknown_pkg.version = package["version"]
-                    db_unknown_pkg.release = package["release"]
-                    db_unknown_pkg.semver = to_semver(package["version"])
-                    db_unknown_pkg.semrel = to_semver(package["release"])
+                    db_unknown_pkg.name = name
+                    db_unknown_pkg.epoch = epoch
+                    db_unknown_pkg.version = version
+                    db_unknown_pkg.release = release
+                    db_unknown_pkg.semver = semvers[version]
+                    db_unknown_pkg.semrel = semvers[release]
                     db_unknown_pkg.arch = db_arch
                     db_unknown_pkg.type = role
                     db_unknown_pkg.count = 0
-                    db.session.add(db_unknown_pkg)
+                    new_rows.append(db_unknown_pkg)
 
-                db_unknown_pkg.count += count
+                db_unknown_pkg.count += pkg_count
+                changed = True
                 continue
 
-            db_reportpackage = get_reportpackage(db, db_report, db_package)
+            db_reportpackage = db_reportpackages.get(db_package.id)
+            if db_reportpackage is None:
+                db_reportpackage = new_reportpackages.get((db_package.id, role))
+
             if db_reportpackage is None:
                 db_reportpackage = ReportPackage()
                 db_reportpackage.report = db_report
                 db_reportpackage.installed_package = db_package
                 db_reportpackage.count = 0
                 db_reportpackage.type = role
-                db.session.add(db_reportpackage)
+                new_reportpackages[(db_package.id, role)] = db_reportpackage
+                new_rows.append(db_reportpackage)
 
-            db_reportpackage.count += count
+            db_reportpackage.count += pkg_count
+            changed = True
+
+        db.session.add_all(new_rows)
+
+        return changed
 
     def validate_ureport(self, ureport) -> bool:
         CentOS.ureport_checker.check(ureport)
@@ -175,12 +245,15 @@ class CentOS(System):
         CentOS.packages_checker.check(packages)
         affected = False
         for package in packages:
-            if "package_role" in package:
-                if package["package_role"] not in CentOS.pkg_roles:
-                    raise FafError("Only the following package roles are allowed: "
-                                   "{0}".format(", ".join(CentOS.pkg_roles)))
-                if package["package_role"] == "affected":
-                    affected = True
+            role = package.get("package_role")
+            if role is None:
+                continue
+
+            if role not in CentOS.pkg_roles:
+                raise FafError("Only the following package roles are allowed: "
+                               "{0}".format(", ".join(sorted(CentOS.pkg_roles))))
+            if role == "affected":
+                affected = True
 
         if not(affected or self.allow_unpackaged):
             raise FafError("uReport must contain affected package")
@@ -188,20 +261,19 @@ class CentOS(System):
         return True
 
     def save_ureport(self, db, db_report, ureport, packages, flush=False, count=1) -> None:
-        self._save_packages(db, db_report, packages, count=count)
+        changed = self._save_packages(db, db_report, packages, count=count)
 
-        if flush:
+        if flush and changed:
             db.session.flush()
 
     def get_releases(self) -> Dict[str, Dict[str, str]]:
-        result = {}
-
-        for release in re.findall(r"[\w\.]+", self.inactive_releases):
-            result[release] = {"status": "EOL"}
-        for release in re.findall(r"[\w\.]+", self.active_releases):
-            result[release] = {"status": "ACTIVE"}
+        self._load_config()
 
-        return result
+        # active releases come last so that they win over inactive ones
+        return {release: {"status": status}
+                for status, releases in (("EOL", self._inactive_release_list),
+                                         ("ACTIVE", self._active_release_list))
+                for release in releases}
 
     def get_components(self, release) -> List[str]:
         if not self.repo_urls:
@@ -209,31 +281,25 @@ class CentOS(System):
             return []
 
         urls = [repo.replace("$releasever", release) for repo in self.repo_urls]
-        components = []
         if "dnf" in repo_types:
             from pyfaf.repos.dnf import Dnf
             dnf = Dnf(self.name, *urls)
-            components.extend(list(set(pkg["name"]
-                                       for pkg in dnf.list_packages(["src"]))))
-        else:
-            raise FafError("No repo type available")
-        return components
+            return list({pkg["name"] for pkg in dnf.list_packages(["src"])})
+
+        raise FafError("No repo type available")
 
-    def get_build_candidates(self, db) -> List[Build]:
-        return (db.session.query(Build)
-                .filter(Build.release.like("%%.el%%"))
-                .all())
+    def get_build_candidates(self, db) -> YieldQueryAdaptor:
+        return YieldQueryAdaptor(db.session.query(Build)
+                                 .filter(Build.release.like("%%.el%%")), 1000)
 
     def check_pkgname_match(self, packages, parser) -> bool:
         for package in packages:
-            if ("package_role" not in package or
-                    package["package_role"].lower() != "affected"):
+            role = package.get("package_role")
+            if not role or role.lower() != "affected":
                 continue
 
-            nvra = "{0}-{1}-{2}.{3}".format(package["name"],
-                                            package["version"],
-                                            package["release"],
-                                            package["architecture"])
+            nvra = (f"{package['name']}-{package['version']}-"
+                    f"{package['release']}.{package['architecture']}")
 
             match = parser.match(nvra)
             if match is not None:
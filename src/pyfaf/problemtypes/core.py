@@ -18,10 +18,10 @@
 
 from __future__ import unicode_literals
 
-from typing import List, Optional
+from typing import Any, Dict, List, Optional, Tuple, Union
 
+import hashlib
 import os
-import shutil
 import satyr
 from pyfaf.problemtypes import ProblemType
 from pyfaf.checker import (Checker,
@@ -35,10 +35,13 @@ from pyfaf.queries import (get_package_by_file,
                            get_reportexe,
                            get_src_package_by_build,
                            get_ssource_by_bpo,
-                           get_symbol_by_name_path)
-from pyfaf.retrace import (addr2line,
+                           get_ssources_by_bpos,
+                           get_symbol_by_name_path,
+                           get_symbols_by_name_paths)
+from pyfaf.retrace import (addr2line_batch,
                            demangle,
                            get_base_address,
+                           remove_unpacked,
                            ssource2funcname,
                            usrmove)
 from pyfaf.storage import (OpSysComponent,
@@ -56,6 +59,10 @@ from pyfaf.utils.hash import hash_list
 
 __all__ = ["CoredumpProblem"]
 
+# {0} is the first byte of the build-id in hex, {1} is the rest
+DEBUG_PATH_TEMPLATES = ("/usr/lib/debug/.build-id/{0}/{1}.debug",
+                        "/usr/lib/.build-id/{0}/{1}")
+
 
 class CoredumpProblem(ProblemType):
     name = "core"
@@ -125,8 +132,7 @@ class CoredumpProblem(ProblemType):
         there is no crash thread or if there are multiple crash threads.
         """
 
-        crashthreads = [t for t in stacktrace if ("crash_thread" in t and
-                                                  t["crash_thread"])]
+        crashthreads = [t for t in stacktrace if t.get("crash_thread")]
         if not crashthreads:
             raise FafError("No crash thread found")
 
@@ -136,39 +142,44 @@ class CoredumpProblem(ProblemType):
         return crashthreads[0]["frames"]
 
     def _hash_backtrace(self, backtrace):
-        result = []
+        keys = ["function_name", "fingerprint", "build_id_offset"]
+
+        # Feed the lines to the hashes one by one instead of building
+        # a list for hash_list(). The digests are the same. All keys are
+        # hashed in a single pass, those missing in any frame are dropped.
+        digests = {key: hashlib.sha1() for key in keys}
+        sane = dict.fromkeys(keys, True)
+        separator = ""
+        for thread in backtrace:
+            if thread.get("crash_thread"):
+                header = (separator + "Crash Thread").encode("utf-8")
+            else:
+                header = (separator + "Thread").encode("utf-8")
+            separator = "\n"
 
-        for key in ["function_name", "fingerprint", "build_id_offset"]:
-            hashbase = []
+            for key in keys:
+                digests[key].update(header)
 
-            threads_sane = []
-            for thread in backtrace:
-                threads_sane.append(all(key in f for f in thread["frames"]))
+            for frame in thread["frames"]:
+                # the part after the key is the same for all keys, note that
+                # the file name is hashed as the repr of ASCII-only bytes
+                suffix = (" @ {0} ({1})"
+                          .format(frame["file_name"].encode("ascii", "ignore"),
+                                  frame.get("build_id"))
+                          .encode("utf-8"))
 
-            if not all(threads_sane):
-                continue
+                for key in keys:
+                    if not sane[key]:
+                        continue
 
-            for thread in backtrace:
-                if "crash_thread" in thread and thread["crash_thread"]:
-                    hashbase.append("Crash Thread")
-                else:
-                    hashbase.append("Thread")
+                    if key not in frame:
+                        sane[key] = False
+                        continue
 
-                for frame in thread["frames"]:
-                    if "build_id" in frame:
-                        build_id = frame["build_id"]
-                    else:
-                        build_id = None
-
-                    hashbase.append("  {0} @ {1} ({2})"
-                                    .format(frame[key],
-                                            frame["file_name"].encode("ascii",
-                                                                      "ignore"),
-                                            build_id))
+                    digests[key].update(b"\n  " + str(frame[key]).encode("utf-8")
+                                        + suffix)
 
-            result.append(hash_list(hashbase))
-
-        return result
+        return [digests[key].hexdigest() for key in keys if sane[key]]
 
     def _db_thread_to_satyr(self, db_thread) -> satyr.GdbThread:
         self.log_debug("Creating threads using satyr")
@@ -238,9 +249,9 @@ class CoredumpProblem(ProblemType):
         return None
 
     def _build_id_to_debug_files(self, build_id) -> List[str]:
-        return ["/usr/lib/debug/.build-id/{0}/{1}.debug".format(build_id[:2],
-                                                                build_id[2:]),
-                "/usr/lib/.build-id/{0}/{1}".format(build_id[:2], build_id[2:])]
+        prefix, suffix = build_id[:2], build_id[2:]
+        return [template.format(prefix, suffix)
+                for template in DEBUG_PATH_TEMPLATES]
 
     def validate_ureport(self, ureport) -> bool:
         # Frames calling JIT compiled functions usually do not contain
@@ -251,28 +262,40 @@ class CoredumpProblem(ProblemType):
         # the frames with file name (the JIT caller) and function name
         # (anonymous function).
         if "stacktrace" in ureport and isinstance(ureport["stacktrace"], list):
+            # Most reports have no JIT caller at all, in which case there is
+            # nothing to fill in and only the last frames need fixing.
+            has_jit = any(isinstance(frame, dict) and
+                          "file_name" in frame and
+                          "function_name" in frame and
+                          "jit" in frame["function_name"].lower()
+                          for thread in ureport["stacktrace"]
+                          if isinstance(thread, dict) and
+                          isinstance(thread.get("frames"), list)
+                          for frame in thread["frames"])
+
             for thread in ureport["stacktrace"]:
                 if not isinstance(thread, dict):
                     continue
 
                 jit_fname = None
                 if "frames" in thread and isinstance(thread["frames"], list):
-                    for frame in thread["frames"]:
-                        if not isinstance(frame, dict):
-                            continue
+                    if has_jit:
+                        for frame in thread["frames"]:
+                            if not isinstance(frame, dict):
+                                continue
 
-                        if ("file_name" in frame and
-                                "function_name" in frame and
-                                "jit" in frame["function_name"].lower()):
+                            if ("file_name" in frame and
+                                    "function_name" in frame and
+                                    "jit" in frame["function_name"].lower()):
 
-                            jit_fname = frame["file_name"]
+                                jit_fname = frame["file_name"]
 
-                        if "file_name" not in frame and jit_fname is not None:
-                            frame["file_name"] = jit_fname
-                            if ("function_name" not in frame or
-                                    frame["function_name"] == "??"):
+                            if "file_name" not in frame and jit_fname is not None:
+                                frame["file_name"] = jit_fname
+                                if ("function_name" not in frame or
+                                        frame["function_name"] == "??"):
 
-                                frame["function_name"] = "anonymous function"
+                                    frame["function_name"] = "anonymous function"
 
                     if thread["frames"]:
                         last_frame = thread["frames"][-1]
@@ -331,6 +354,32 @@ class CoredumpProblem(ProblemType):
         if not db_report.backtraces:
             new_symbols = {}
             new_symbolsources = {}
+            new_frames = []
+
+            # the same files repeat across frames, normalize each only once
+            abs_paths = {}
+            norm_paths = {}
+
+            # look up all known symbols and symbol sources at once
+            symbol_keys = set()
+            ssource_keys = set()
+            for thread in ureport["stacktrace"]:
+                for frame in thread["frames"]:
+                    file_name = frame["file_name"]
+                    if file_name not in abs_paths:
+                        abs_paths[file_name] = os.path.abspath(file_name)
+                        norm_paths[file_name] = get_libname(abs_paths[file_name])
+
+                    path = abs_paths[file_name]
+                    if "function_name" in frame:
+                        symbol_keys.add((frame["function_name"],
+                                         norm_paths[file_name]))
+
+                    ssource_keys.add((frame.get("build_id"), path,
+                                      frame["build_id_offset"]))
+
+            db_symbols = get_symbols_by_name_paths(db, symbol_keys)
+            db_symbolsources = get_ssources_by_bpos(db, ssource_keys)
 
             db_backtrace = ReportBacktrace()
             db_backtrace.report = db_report
@@ -347,7 +396,7 @@ class CoredumpProblem(ProblemType):
             for thread in ureport["stacktrace"]:
                 tid += 1
 
-                crash = "crash_thread" in thread and thread["crash_thread"]
+                crash = thread.get("crash_thread", False)
                 db_thread = ReportBtThread()
                 db_thread.backtrace = db_backtrace
                 db_thread.number = tid
@@ -365,27 +414,18 @@ class CoredumpProblem(ProblemType):
                     # optimization.
                     fid += 10
 
-                    if "build_id" in frame:
-                        build_id = frame["build_id"]
-                    else:
-                        build_id = None
-
-                    if "fingerprint" in frame:
-                        fingerprint = frame["fingerprint"]
-                    else:
-                        fingerprint = None
+                    build_id = frame.get("build_id")
+                    fingerprint = frame.get("fingerprint")
 
-                    path = os.path.abspath(frame["file_name"])
+                    path = abs_paths[frame["file_name"]]
                     offset = frame["build_id_offset"]
 
                     db_symbol = None
                     if "function_name" in frame:
-                        norm_path = get_libname(path)
+                        norm_path = norm_paths[frame["file_name"]]
 
-                        db_symbol = \
-                            get_symbol_by_name_path(db,
-                                                    frame["function_name"],
-                                                    norm_path)
+                        db_symbol = db_symbols.get((frame["function_name"],
+                                                    norm_path))
                         if db_symbol is None:
                             key = (frame["function_name"], norm_path)
                             if key in new_symbols:
@@ -394,11 +434,10 @@ class CoredumpProblem(ProblemType):
                                 db_symbol = Symbol()
                                 db_symbol.name = frame["function_name"]
                                 db_symbol.normalized_path = norm_path
-                                db.session.add(db_symbol)
                                 new_symbols[key] = db_symbol
 
-                    db_symbolsource = get_ssource_by_bpo(db, build_id,
-                                                         path, offset)
+                    db_symbolsource = db_symbolsources.get((build_id, path,
+                                                            offset))
 
                     if db_symbolsource is None:
                         key = (build_id, path, offset)
@@ -412,7 +451,6 @@ class CoredumpProblem(ProblemType):
                             db_symbolsource.path = path
                             db_symbolsource.offset = offset
                             db_symbolsource.hash = fingerprint
-                            db.session.add(db_symbolsource)
                             new_symbolsources[key] = db_symbolsource
 
                     db_frame = ReportBtFrame()
@@ -420,7 +458,11 @@ class CoredumpProblem(ProblemType):
                     db_frame.order = fid
                     db_frame.symbolsource = db_symbolsource
                     db_frame.inlined = False
-                    db.session.add(db_frame)
+                    new_frames.append(db_frame)
+
+            db.session.add_all(new_symbols.values())
+            db.session.add_all(new_symbolsources.values())
+            db.session.add_all(new_frames)
 
         if flush:
             db.session.flush()
@@ -437,31 +479,28 @@ class CoredumpProblem(ProblemType):
         return satyr_report1.distance(satyr_report2)
 
     def check_btpath_match(self, ureport, parser) -> bool:
-        crash_thread = None
-        for thread in ureport["stacktrace"]:
-            if "crash_thread" not in thread or not thread["crash_thread"]:
-                continue
-            crash_thread = thread
-
-        for frame in crash_thread["frames"]:
-            match = parser.match(frame["file_name"])
-
-            if match is not None:
-                return True
+        # validate_ureport() guarantees there is exactly one crash thread
+        crash_thread = next((t for t in ureport["stacktrace"]
+                             if t.get("crash_thread")), None)
+        if crash_thread is None:
+            return False
 
-        return False
+        match = parser.match
+        return any(match(frame["file_name"]) is not None
+                   for frame in crash_thread["frames"])
 
     def _get_ssources_for_retrace_query(self, db):
-        core_syms = (db.session.query(SymbolSource.id)
-                     .join(ReportBtFrame)
+        # correlated EXISTS lets the planner use a semi-join instead of
+        # materializing every core symbol source id
+        core_syms = (db.session.query(ReportBtFrame.symbolsource_id)
                      .join(ReportBtThread)
                      .join(ReportBacktrace)
                      .join(Report)
-                     .filter(Report.type == CoredumpProblem.name)
-                     .subquery())
+                     .filter(ReportBtFrame.symbolsource_id == SymbolSource.id)
+                     .filter(Report.type == CoredumpProblem.name))
 
         q = (db.session.query(SymbolSource)
-             .filter(SymbolSource.id.in_(core_syms))
+             .filter(core_syms.exists())
              .filter(SymbolSource.build_id.isnot(None))
              .filter((SymbolSource.symbol_id.is_(None)) |
                      (SymbolSource.source_path.is_(None)) |
@@ -525,14 +564,83 @@ class CoredumpProblem(ProblemType):
 
         return db_ssource, (db_debug_package, db_bin_package, db_src_package)
 
+    def _addr2line_ssources(self, unpacked_path: str,
+                            db_ssources: List[SymbolSource],
+                            debuginfo_path: str) \
+            -> Dict[SymbolSource, List[Tuple[str, Any, int]]]:
+        """
+        Run eu-addr2line for all `db_ssources` of a binary package unpacked
+        to `unpacked_path`, once per binary rather than once per symbol source.
+        Return a dictionary {db_ssource: addr2line result}. Symbol sources that
+        could not be resolved are left out.
+        """
+
+        # many symbol sources share a binary, read its ELF headers only once
+        base_addresses: Dict[str, Union[int, FafError]] = {}
+        addresses: Dict[str, Dict[SymbolSource, int]] = {}
+        for db_ssource in db_ssources:
+            binary = os.path.join(unpacked_path, db_ssource.path[1:])
+
+            if binary not in base_addresses:
+                try:
+                    base_addresses[binary] = get_base_address(binary)
+                except FafError as ex:
+                    base_addresses[binary] = ex
+
+            base_address = base_addresses[binary]
+            if isinstance(base_address, FafError):
+                self.log_debug("get_base_address failed: %s", str(base_address))
+                continue
+
+            addresses.setdefault(binary, {})[db_ssource] = (base_address +
+                                                            db_ssource.offset)
+
+        result: Dict[SymbolSource, List[Tuple[str, Any, int]]] = {}
+        for binary, ssource_addresses in addresses.items():
+            try:
+                debug_path = os.path.join(debuginfo_path, "usr", "lib", "debug")
+                binary_results = addr2line_batch(binary,
+                                                 list(ssource_addresses.values()),
+                                                 debug_path)
+            except Exception as ex: # pylint: disable=broad-except
+                self.log_debug("addr2line failed: %s", str(ex))
+                continue
+
+            for db_ssource, address in ssource_addresses.items():
+                binary_result = binary_results[address]
+                if isinstance(binary_result, FafError):
+                    self.log_debug("addr2line failed: %s", str(binary_result))
+                    continue
+
+                # symbol sources may share the address, each needs its own copy
+                result[db_ssource] = list(binary_result)
+
+        return result
+
     def retrace(self, db, task) -> None:
+        # Retracing is bound by eu-addr2line and eu-unstrip: process start-up
+        # and DWARF parsing dominate, not the Python code here. That is why
+        # _addr2line_ssources() runs one eu-addr2line per binary for all its
+        # symbol sources. To speed this up further, cut the number of
+        # subprocess calls or run more RetracePool workers rather than tuning
+        # the loops below. save_ureport() is bound by database round trips,
+        # hence the bulk lookups there.
         new_symbols = {}
         new_symbolsources = {}
+        norm_paths = {}
+        # thread -> {frame: index of the frame when sorted by order}
+        frame_indices = {}
 
         for bin_pkg, db_ssources in task.binary_packages.items():
             self.log_info("Retracing symbols from package {0}"
                           .format(bin_pkg.nvra))
 
+            resolved = {}
+            if bin_pkg.unpacked_path is not None:
+                resolved = self._addr2line_ssources(bin_pkg.unpacked_path,
+                                                    db_ssources,
+                                                    task.debuginfo.unpacked_path)
+
             i = 0
             for db_ssource in db_ssources:
                 i += 1
@@ -541,31 +649,21 @@ class CoredumpProblem(ProblemType):
                                i, len(db_ssources), ssource2funcname(db_ssource),
                                db_ssource.path)
 
-                norm_path = get_libname(db_ssource.path)
+                if db_ssource.path not in norm_paths:
+                    norm_paths[db_ssource.path] = get_libname(db_ssource.path)
+                norm_path = norm_paths[db_ssource.path]
 
                 if bin_pkg.unpacked_path is None:
                     self.log_debug("fail: path to unpacked binary package not found")
                     db_ssource.retrace_fail_count += 1
                     continue
 
-                binary = os.path.join(bin_pkg.unpacked_path, db_ssource.path[1:])
-
-                try:
-                    address = get_base_address(binary) + db_ssource.offset
-                except FafError as ex:
-                    self.log_debug("get_base_address failed: %s", str(ex))
+                if db_ssource not in resolved:
                     db_ssource.retrace_fail_count += 1
                     continue
 
-                try:
-                    debug_path = os.path.join(task.debuginfo.unpacked_path,
-                                              "usr", "lib", "debug")
-                    results = addr2line(binary, address, debug_path)
-                    results.reverse()
-                except Exception as ex: # pylint: disable=broad-except
-                    self.log_debug("addr2line failed: %s", str(ex))
-                    db_ssource.retrace_fail_count += 1
-                    continue
+                results = resolved[db_ssource]
+                results.reverse()
 
                 inl_id = 0
                 while len(results) > 1:
@@ -609,11 +707,15 @@ class CoredumpProblem(ProblemType):
                             new_symbolsources[key] = db_ssource_inl
 
                     for db_frame in db_ssource.frames:
-                        db_frames = sorted(db_frame.thread.frames,
-                                           key=lambda f: f.order)
-                        idx = db_frames.index(db_frame)
+                        db_thread = db_frame.thread
+                        if db_thread not in frame_indices:
+                            db_frames = sorted(db_thread.frames,
+                                               key=lambda f: f.order)
+                            frame_indices[db_thread] = {f: i for i, f
+                                                        in enumerate(db_frames)}
+                        idx = frame_indices[db_thread][db_frame]
                         if idx > 0:
-                            prevframe = db_frame.thread.frames[idx - 1]
+                            prevframe = db_thread.frames[idx - 1]
                             if (prevframe.inlined and
                                     prevframe.symbolsource == db_ssource_inl):
 
@@ -625,6 +727,8 @@ class CoredumpProblem(ProblemType):
                         db_newframe.inlined = True
                         db_newframe.order = db_frame.order - inl_id
                         db.session.add(db_newframe)
+                        # the thread has a new frame, sort it again next time
+                        del frame_indices[db_thread]
 
                 funcname, srcfile, srcline = results.pop()
                 self.log_debug("Result: %s", funcname)
@@ -651,16 +755,16 @@ class CoredumpProblem(ProblemType):
 
         if task.debuginfo.unpacked_path is not None:
             self.log_debug("Removing %s", task.debuginfo.unpacked_path)
-            shutil.rmtree(task.debuginfo.unpacked_path, ignore_errors=True)
+            remove_unpacked(task.debuginfo.unpacked_path)
 
         if task.source is not None and task.source.unpacked_path is not None:
             self.log_debug("Removing %s", task.source.unpacked_path)
-            shutil.rmtree(task.source.unpacked_path, ignore_errors=True)
+            remove_unpacked(task.source.unpacked_path)
 
         for bin_pkg in task.binary_packages.keys():
             if bin_pkg.unpacked_path is not None:
                 self.log_debug("Removing %s", bin_pkg.unpacked_path)
-                shutil.rmtree(bin_pkg.unpacked_path, ignore_errors=True)
+                remove_unpacked(bin_pkg.unpacked_path)
 
     def find_crash_function(self, db_backtrace) -> Optional[str]:
         for db_thread in db_backtrace.threads:
@@ -20,7 +20,6 @@ from __future__ import unicode_literals
 
 import os
 import pickle
-import shutil
 
 from typing import Optional, Tuple
 
@@ -40,7 +39,10 @@ from pyfaf.queries import (get_archs,
                            get_ssource_by_bpo,
                            get_symbol_by_name_path,
                            get_taint_flag_by_ureport_name)
-from pyfaf.retrace import addr2line, demangle, get_function_offset_map
+from pyfaf.retrace import (addr2line,
+                           demangle,
+                           get_function_offset_map,
+                           remove_unpacked)
 from pyfaf.storage import (KernelModule,
                            KernelTaintFlag,
                            PackageDependency,
@@ -723,11 +725,11 @@ class KerneloopsProblem(ProblemType):
 
         if task.debuginfo is not None:
             self.log_debug("Removing %s", task.debuginfo.unpacked_path)
-            shutil.rmtree(task.debuginfo.unpacked_path, ignore_errors=True)
+            remove_unpacked(task.debuginfo.unpacked_path)
 
         if task.source is not None and task.source.unpacked_path is not None:
             self.log_debug("Removing %s", task.source.unpacked_path)
-            shutil.rmtree(task.source.unpacked_path, ignore_errors=True)
+            remove_unpacked(task.source.unpacked_path)
 
     def check_btpath_match(self, ureport, parser) -> bool:
         for frame in ureport["frames"]:
@@ -19,16 +19,17 @@
 import datetime
 import functools
 
-from typing import List, Optional, Tuple, Union
+from typing import Any, Dict, Iterator, List, Optional, Tuple, Union
 
-from sqlalchemy import func, desc, inspect
+from sqlalchemy import func, desc, inspect, tuple_
 from sqlalchemy.orm import load_only, aliased
 from sqlalchemy.orm.query import Query
 
 from pyfaf.opsys import systems
 import pyfaf.storage as st
 
-__all__ = ["get_arch_by_name", "get_archs", "get_associate_by_name",
+__all__ = ["get_arch_by_name", "get_archs", "get_archs_by_names",
+           "get_associate_by_name",
            "get_backtrace_by_hash", "get_backtraces_by_type",
            "get_bugtracker_by_name", "get_bz_attachment", "get_bz_bug",
            "get_bz_comment", "get_bz_user",
@@ -50,20 +51,24 @@ __all__ = ["get_arch_by_name", "get_archs", "get_associate_by_name",
            "get_package_by_file", "get_packages_by_file",
            "get_package_by_file_build_arch", "get_packages_by_file_builds_arch",
            "get_package_by_name_build_arch", "get_package_by_nevra",
+           "get_packages_by_nevras",
            "get_problem_by_id", "get_problems", "get_problem_component",
            "get_empty_problems", "get_problem_opsysrelease",
            "get_build_by_nevr", "get_release_ids", "get_releases", "get_report",
            "get_report_count_by_component", "get_report_release_desktop",
            "get_report_stats_by_component", "get_report_by_id",
            "get_reports_for_problems", "get_reportarch", "get_reportexe",
-           "get_reportosrelease", "get_reportpackage", "get_reportreason",
+           "get_reportosrelease", "get_reportpackage", "get_reportpackages_bulk",
+           "get_reportreason",
            "get_reports_by_type", "get_reportbz", "get_reportmantis",
            "get_reports_for_opsysrelease", "get_repos_by_wildcards", "get_repos_for_opsys",
-           "get_src_package_by_build", "get_ssource_by_bpo",
+           "get_src_package_by_build", "get_ssource_by_bpo", "get_ssources_by_bpos",
            "get_ssources_for_retrace", "get_supported_components",
-           "get_symbol_by_name_path", "get_symbolsource",
+           "get_symbol_by_name_path", "get_symbols_by_name_paths",
+           "get_symbolsource",
            "get_taint_flag_by_ureport_name", "get_unassigned_reports",
-           "get_unknown_opsys", "get_unknown_package", "update_frame_ssource",
+           "get_unknown_opsys", "get_unknown_package", "get_unknown_packages_bulk",
+           "update_frame_ssource",
            "query_hot_problems", "query_longterm_problems",
            "user_is_maintainer", "get_packages_by_osrelease", "get_all_report_hashes",
            "delete_bz_user", "get_reportcontactmails_by_id",
@@ -74,6 +79,18 @@ __all__ = ["get_arch_by_name", "get_archs", "get_associate_by_name",
            "get_bz_comment", "get_bz_user", "get_builds_by_opsysrelease_id",
            "delete_mantis_bugzilla", "get_builds_by_arch_id", "get_bugtracker_report",]
 
+# Maximum number of values passed in a single IN (...) clause
+IN_CHUNK_SIZE = 900
+
+
+def _chunks(values: List[Any], size: int = IN_CHUNK_SIZE) -> Iterator[List[Any]]:
+    """
+    Split the list `values` into lists of at most `size` items.
+    """
+
+    for i in range(0, len(values), size):
+        yield values[i:i + size]
+
 
 def get_arch_by_name(db, arch_name) -> Optional[st.Arch]:
     """
@@ -95,6 +112,21 @@ def get_archs(db) -> List[st.Arch]:
             .all())
 
 
+def get_archs_by_names(db, arch_names) -> Dict[str, st.Arch]:
+    """
+    Return a dictionary mapping architecture names from `arch_names`
+    to pyfaf.storage.Arch objects. Unknown names are left out.
+    """
+
+    if not arch_names:
+        return {}
+
+    return {db_arch.name: db_arch
+            for db_arch in (db.session.query(st.Arch)
+                            .filter(st.Arch.name.in_(set(arch_names)))
+                            .all())}
+
+
 def get_associate_by_name(db, name) -> Optional[st.AssociatePeople]:
     """
     Returns pyfaf.storage.AssociatePeople object with given
@@ -588,6 +620,31 @@ def get_package_by_nevra(db, name, epoch, version, release, arch) -> Optional[st
             .first())
 
 
+def get_packages_by_nevras(db, nevras) -> Dict[Tuple, st.Package]:
+    """
+    Return a dictionary mapping (name, epoch, version, release, arch) tuples
+    from `nevras` to pyfaf.storage.Package objects. NEVRAs not found
+    in storage are left out.
+    """
+
+    result: Dict[Tuple, st.Package] = {}
+    nevras = list(set(nevras))
+    for chunk in _chunks(nevras):
+        rows = (db.session.query(st.Package, st.Build.epoch, st.Build.version,
+                                 st.Build.release, st.Arch.name)
+                .join(st.Build)
+                .join(st.Arch)
+                .filter(tuple_(st.Package.name, st.Build.epoch,
+                               st.Build.version, st.Build.release,
+                               st.Arch.name).in_(chunk))
+                .all())
+
+        for db_package, epoch, version, release, arch in rows:
+            result[(db_package.name, epoch, version, release, arch)] = db_package
+
+    return result
+
+
 def get_build_by_nevr(db, name, epoch, version, release) -> Optional[st.Build]:
     """
     Return pyfaf.storage.Build object from NEVR or None if not found.
@@ -981,6 +1038,25 @@ def get_reportpackage(db, report, package) -> Optional[st.ReportPackage]:
             .first())
 
 
+def get_reportpackages_bulk(db, report, package_ids) -> Dict[int, st.ReportPackage]:
+    """
+    Return a dictionary mapping IDs of installed packages from `package_ids`
+    to pyfaf.storage.ReportPackage objects of the given pyfaf.storage.Report.
+    """
+    if not report.id or not package_ids:
+        return {}
+
+    result: Dict[int, st.ReportPackage] = {}
+    for chunk in _chunks(list(set(package_ids))):
+        for db_reportpackage in (db.session.query(st.ReportPackage)
+                                 .filter(st.ReportPackage.report == report)
+                                 .filter(st.ReportPackage.installed_package_id.in_(chunk))
+                                 .all()):
+            result[db_reportpackage.installed_package_id] = db_reportpackage
+
+    return result
+
+
 def get_reportreason(db, report, reason) -> Optional[st.ReportReason]:
     """
     Return pyfaf.storage.ReportReason object from pyfaf.storage.Report
@@ -1166,6 +1242,41 @@ def get_ssource_by_bpo(db, build_id, path, offset) -> Optional[st.SymbolSource]:
             .first())
 
 
+def get_ssources_by_bpos(db, bpos) -> Dict[Tuple, st.SymbolSource]:
+    """
+    Return a dictionary mapping (build id, path, offset) tuples from `bpos`
+    to pyfaf.storage.SymbolSource objects. Tuples not found in storage
+    are left out.
+    """
+
+    result: Dict[Tuple, st.SymbolSource] = {}
+    bpos = list(set(bpos))
+
+    # NULL never matches in a tuple IN clause
+    with_build_id = [bpo for bpo in bpos if bpo[0] is not None]
+    without_build_id = [bpo[1:] for bpo in bpos if bpo[0] is None]
+
+    for chunk in _chunks(with_build_id):
+        for db_ssource in (db.session.query(st.SymbolSource)
+                           .filter(tuple_(st.SymbolSource.build_id,
+                                          st.SymbolSource.path,
+                                          st.SymbolSource.offset).in_(chunk))
+                           .all()):
+            result.setdefault((db_ssource.build_id, db_ssource.path,
+                               db_ssource.offset), db_ssource)
+
+    for chunk in _chunks(without_build_id):
+        for db_ssource in (db.session.query(st.SymbolSource)
+                           .filter(st.SymbolSource.build_id.is_(None))
+                           .filter(tuple_(st.SymbolSource.path,
+                                          st.SymbolSource.offset).in_(chunk))
+                           .all()):
+            result.setdefault((None, db_ssource.path, db_ssource.offset),
+                              db_ssource)
+
+    return result
+
+
 def get_ssources_for_retrace(db, problemtype) -> List[st.SymbolSource]:
     """
     Return a list of pyfaf.storage.SymbolSource objects of given
@@ -1208,6 +1319,25 @@ def get_symbol_by_name_path(db, name, path) -> Optional[st.Symbol]:
             .first())
 
 
+def get_symbols_by_name_paths(db, name_paths) -> Dict[Tuple[str, str], st.Symbol]:
+    """
+    Return a dictionary mapping (symbol name, normalized path) tuples from
+    `name_paths` to pyfaf.storage.Symbol objects. Tuples not found in storage
+    are left out.
+    """
+
+    result: Dict[Tuple[str, str], st.Symbol] = {}
+    for chunk in _chunks(list(set(name_paths))):
+        for db_symbol in (db.session.query(st.Symbol)
+                          .filter(tuple_(st.Symbol.name,
+                                         st.Symbol.normalized_path).in_(chunk))
+                          .all()):
+            result.setdefault((db_symbol.name, db_symbol.normalized_path),
+                              db_symbol)
+
+    return result
+
+
 def get_symbolsource(db, symbol, filename, offset) -> Optional[st.SymbolSource]:
     """
     Return pyfaf.storage.SymbolSource object from pyfaf.storage.Symbol,
@@ -1266,6 +1396,36 @@ def get_unknown_package(db, db_report, role, name,
             .first())
 
 
+def get_unknown_packages_bulk(db, db_report, nevras) -> Dict[Tuple, st.ReportUnknownPackage]:
+    """
+    Return a dictionary mapping (role, name, epoch, version, release, arch)
+    tuples to pyfaf.storage.ReportUnknownPackage objects of the given
+    pyfaf.storage.Report whose NEVRA is listed in `nevras`.
+    """
+    if not db_report.id or not nevras:
+        return {}
+
+    result: Dict[Tuple, st.ReportUnknownPackage] = {}
+    nevras = list(set(nevras))
+    for chunk in _chunks(nevras):
+        rows = (db.session.query(st.ReportUnknownPackage, st.Arch.name)
+                .join(st.Arch)
+                .filter(st.ReportUnknownPackage.report == db_report)
+                .filter(tuple_(st.ReportUnknownPackage.name,
+                               st.ReportUnknownPackage.epoch,
+                               st.ReportUnknownPackage.version,
+                               st.ReportUnknownPackage.release,
+                               st.Arch.name).in_(chunk))
+                .all())
+
+        for db_unknown_pkg, arch in rows:
+            result[(db_unknown_pkg.type, db_unknown_pkg.name,
+                    db_unknown_pkg.epoch, db_unknown_pkg.version,
+                    db_unknown_pkg.release, arch)] = db_unknown_pkg
+
+    return result
+
+
 def get_packages_and_their_reports_unknown_packages(db) -> Query:
     """
     Return tuples (st.Package, ReportUnknownPackage) that are joined by package name and
@@ -1,4 +1,6 @@
+import functools
 import re
+import shutil
 from concurrent import futures
 
 from typing import Any, Dict, List, Optional, Tuple, Union
@@ -22,9 +24,16 @@ RE_ADDR2LINE_LINE1 = re.compile(r"^([_0-9a-zA-Z\.~<>@:\*&,\)"
 
 RE_UNSTRIP_BASE_OFFSET = re.compile(r"^((0x)?[0-9a-f]+)")
 
+# Removing unpacked packages can take seconds, do not hold up retracing.
+# The executor's threads are joined at interpreter exit, so pending
+# removals still finish.
+_cleanup_executor = futures.ThreadPoolExecutor(max_workers=2,
+                                               thread_name_prefix="Cleanup")
+
 __all__ = ["IncompleteTask", "RetraceTaskPackage", "RetraceTask",
-           "RetracePool", "addr2line", "demangle", "get_base_address",
-           "ssource2funcname", "usrmove"]
+           "RetracePool", "addr2line", "addr2line_batch", "demangle",
+           "get_base_address", "remove_unpacked", "ssource2funcname",
+           "usrmove"]
 
 
 class IncompleteTask(FafError):
@@ -193,66 +202,154 @@ def addr2line(binary_path: str, address: int, debuginfo_dir: str) -> List[Tuple[
     (assuming that entry point is on the bottom of the stacktrace).
     """
 
-    result = []
-    funcname = None
-    srcfile = "??"
-    srcline = 0
+    result = addr2line_batch(binary_path, [address], debuginfo_dir)[address]
+    if isinstance(result, FafError):
+        raise result
+
+    return result
+
+
+# Too few public methods
+# pylint: disable-msg=R0903
+class Addr2LineState:
+    """
+    Lookup state of a single address resolved by addr2line_batch.
+    """
+
+    def __init__(self) -> None:
+        self.funcname: Optional[str] = None
+        self.srcfile: str = "??"
+        self.srcline: int = 0
+        self.inlined: List[Tuple[str, Any, int]] = []
+
+
+def _run_addr2line(binary_path: str, addrs: List[str], debuginfo_dir: str) \
+        -> Optional[List[str]]:
+    """
+    Run eu-addr2line on hexadecimal addresses `addrs` of a binary and return
+    its output lines, two for each address, or None if it failed.
+    """
+
+    child = safe_popen("eu-addr2line",
+                       "--executable", binary_path,
+                       "--debuginfo-path", debuginfo_dir,
+                       "--functions", *addrs,
+                       encoding="utf-8")
+
+    if child is None:
+        return None
+
+    return child.stdout.splitlines()
+
+
+def addr2line_batch(binary_path: str, addresses: List[int], debuginfo_dir: str) \
+        -> Dict[int, Union[List[Tuple[str, Any, int]], FafError]]:
+    """
+    Same as addr2line, but resolves all `addresses` of a single binary
+    running eu-addr2line once per lookup round instead of once per address.
+    Returns a dictionary mapping every address either to the list of triplets
+    described in addr2line or to a FafError explaining why it failed.
+    """
+
+    state = {address: Addr2LineState() for address in set(addresses)}
+    results: Dict[int, Union[List[Tuple[str, Any, int]], FafError]] = {}
 
     # eu-addr2line often finds the symbol if we decrement the address by one.
     # we try several addresses that maps to no file or to the same source file
     # and source line as the original address.
+    pending = sorted(state)
     for addr_enh in range(0, 15):
-        if addr_enh > address:
+        pending = [address for address in pending if addr_enh <= address]
+        if not pending:
             break
 
-        addr = "0x{0:x}".format(address - addr_enh)
-        child = safe_popen("eu-addr2line",
-                           "--executable", binary_path,
-                           "--debuginfo-path", debuginfo_dir,
-                           "--functions", addr,
-                           encoding="utf-8")
-
-        if child is None:
+        addrs = ["0x{0:x}".format(address - addr_enh) for address in pending]
+        lines = _run_addr2line(binary_path, addrs, debuginfo_dir)
+        if lines is None:
             raise FafError("eu-add2line failed")
 
-        line1, line2 = child.stdout.splitlines()
-        # format of the line2 is filename:lineno[:columnno]
-        line2_parts = line2.split(":")
-        line2_srcfile = line2_parts[0]
-        line2_srcline = int(line2_parts[1])
+        outputs: List[Optional[List[str]]]
+        if len(lines) == 2 * len(pending):
+            outputs = [lines[i:i + 2] for i in range(0, len(lines), 2)]
+        else:
+            # the output can not be paired with the addresses,
+            # run eu-addr2line for each of them separately
+            outputs = [_run_addr2line(binary_path, [addr], debuginfo_dir)
+                       for addr in addrs]
+
+        unresolved = []
+        for address, output in zip(pending, outputs):
+            if output is None or len(output) != 2:
+                results[address] = FafError("Unexpected output from "
+                                            "eu-addr2line for 0x{0:x}"
+                                            .format(address))
+                continue
 
-        match = RE_ADDR2LINE_LINE1.match(line1)
-        if match is None:
-            raise FafError("Unexpected output from eu-addr2line: '{0}'"
-                           .format(line1))
+            line1, line2 = output
+            addr_state = state[address]
 
-        if ((srcfile != line2_srcfile or srcline != line2_srcline)
-            and (srcfile != "??" or srcline != 0)):
-            break
+            # format of the line2 is filename:lineno[:columnno]
+            line2_parts = line2.split(":")
+            try:
+                line2_srcfile = line2_parts[0]
+                line2_srcline = int(line2_parts[1])
+            except (IndexError, ValueError):
+                results[address] = FafError("Unexpected output from "
+                                            "eu-addr2line: '{0}'".format(line2))
+                continue
+
+            match = RE_ADDR2LINE_LINE1.match(line1)
+            if match is None:
+                results[address] = FafError("Unexpected output from "
+                                            "eu-addr2line: '{0}'".format(line1))
+                continue
+
+            if ((addr_state.srcfile != line2_srcfile
+                 or addr_state.srcline != line2_srcline)
+                    and (addr_state.srcfile != "??" or addr_state.srcline != 0)):
+                continue
 
-        if match.group(1) == "??":
-            srcfile = line2_srcfile
-            srcline = line2_srcline
+            if match.group(1) == "??":
+                addr_state.srcfile = line2_srcfile
+                addr_state.srcline = line2_srcline
+                unresolved.append(address)
+                continue
+            if match.group(3) is None:
+                addr_state.funcname = match.group(1)
+                addr_state.srcfile = line2_srcfile
+                addr_state.srcline = line2_srcline
+            else:
+                addr_state.funcname = match.group(6)
+                addr_state.srcfile = match.group(4)
+                addr_state.srcline = int(match.group(5))
+
+                addr_state.inlined.append((match.group(1), line2_srcfile,
+                                           line2_srcline))
+
+        pending = unresolved
+
+    for address, addr_state in state.items():
+        if address in results:
             continue
-        if match.group(3) is None:
-            funcname = match.group(1)
-            srcfile = line2_srcfile
-            srcline = line2_srcline
-        else:
-            funcname = match.group(6)
-            srcfile = match.group(4)
-            srcline = int(match.group(5))
 
-            result.append((match.group(1), line2_srcfile, line2_srcline))
+        if addr_state.funcname is None:
+            results[address] = FafError("eu-addr2line cannot find function name")
+            continue
 
-        break
+        results[address] = addr_state.inlined + [(addr_state.funcname,
+                                                  addr_state.srcfile,
+                                                  addr_state.srcline)]
 
-    if funcname is None:
-        raise FafError("eu-addr2line cannot find function name")
+    return results
 
-    result.append((funcname, srcfile, srcline))
 
-    return result
+def remove_unpacked(path: str) -> None:
+    """
+    Remove the directory `path` with an unpacked package in the background.
+    Errors are ignored, same as shutil.rmtree(path, ignore_errors=True).
+    """
+
+    _cleanup_executor.submit(shutil.rmtree, path, ignore_errors=True)
 
 
 def get_base_address(binary_path: str) -> int:
@@ -274,14 +371,16 @@ def get_base_address(binary_path: str) -> int:
     return int(match.group(1), 16)
 
 
-def demangle(mangled: str) -> Union[None, str]:
+@functools.lru_cache(maxsize=131072)
+def _demangle(mangled: str) -> str:
     """
-    Demangle C++ symbol name.
+    Run c++filt on a mangled C++ symbol name. Raises FafError if it fails,
+    so that only successful results are cached.
     """
 
     child = safe_popen("c++filt", mangled, encoding="utf-8")
     if child is None:
-        return None
+        raise FafError("c++filt failed")
 
     result = child.stdout.strip()
     if result != mangled:
@@ -290,6 +389,19 @@ def demangle(mangled: str) -> Union[None, str]:
     return result
 
 
+def demangle(mangled: str) -> Union[None, str]:
+    """
+    Demangle C++ symbol name. The results are cached, mangled names repeat
+    heavily across the frames being retraced. Failures are not cached
+    and are retried on the next call.
+    """
+
+    try:
+        return _demangle(mangled)
+    except FafError:
+        return None
+
+
 def usrmove(path: str) -> str:
     """
     Adds or cuts off /usr prefix from the path.
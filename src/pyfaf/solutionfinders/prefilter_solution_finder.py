@@ -92,6 +92,29 @@ class PrefilterSolutionFinder(SolutionFinder):
 
         return result
 
+    def _get_combined_parser(self, parsers) -> Optional[Pattern]:
+        """
+        Join all `parsers` into a single alternation, so that a string that
+        matches none of them is rejected in one pass. Return None if there
+        is nothing to join or the patterns can not be combined safely.
+        """
+
+        if len(parsers) < 2:
+            return None
+
+        # Joining renumbers the groups, which breaks numbered backreferences,
+        # and inline global flags such as (?x) would apply to all patterns.
+        if any(parser.groups or parser.flags & ~re.UNICODE
+               for parser in parsers):
+            return None
+
+        try:
+            return re.compile("|".join("(?:{0})".format(parser.pattern)
+                                       for parser in parsers))
+        except re.error as ex:
+            log.debug("Unable to combine patterns: %s", str(ex))
+            return None
+
     def find_solution_ureport(self, db, ureport, osr=None) -> Optional[SfPrefilterSolution]:
         """
         Check whether uReport matches a knowledgebase
@@ -117,6 +140,12 @@ class PrefilterSolutionFinder(SolutionFinder):
                             osplugin.nice_name)
             else:
                 pkgname_parsers = self._get_pkgname_parsers(db, db_opsys=db_opsys)
+                combined_parser = self._get_combined_parser(pkgname_parsers)
+                if (combined_parser is not None and
+                        not osplugin.check_pkgname_match(ureport["packages"],
+                                                         combined_parser)):
+                    pkgname_parsers = {}
+
                 for parser, solution in pkgname_parsers.items():
                     if osplugin.check_pkgname_match(ureport["packages"], parser):
                         return self._sfps_to_solution(solution)
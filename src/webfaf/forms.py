@@ -2,13 +2,13 @@ import datetime
 import re
 from collections import defaultdict
 from operator import itemgetter
-from hashlib import sha1
+from hashlib import blake2b
 
 from typing import Any, List, Tuple
 
 from flask import g
 
-from sqlalchemy import asc
+from sqlalchemy import asc, exists, select
 
 from wtforms import (Form,
                      SubmitField,
@@ -22,12 +22,25 @@ from wtforms import (Form,
 from wtforms.ext.sqlalchemy.fields import (QuerySelectMultipleField,
                                            QuerySelectField)
 
-from pyfaf.storage import OpSysRelease, OpSysComponent, Report, KernelTaintFlag
+from pyfaf.storage import (GenericTable,
+                           OpSysRelease,
+                           OpSysComponent,
+                           Report,
+                           KernelTaintFlag)
 from pyfaf.storage.opsys import AssociatePeople, Arch
 from pyfaf.problemtypes import problemtypes
 from pyfaf.bugtrackers import bugtrackers
 from pyfaf.queries import get_associate_by_name
 
+# bug ID in a bugtracker URL, e.g. show_bug.cgi?id=123456
+RE_BUG_ID = re.compile(r"id=(\d+)")
+
+# zero padded YYYY-MM-DD date
+RE_ISO_DATE = re.compile(r"^[0-9]{4}-[0-9]{2}-[0-9]{2}$")
+
+# date.fromisoformat() is only available since Python 3.7
+_date_fromisoformat = getattr(datetime.date, "fromisoformat", None)
+
 
 class DaterangeField(StringField):
     date_format = "%Y-%m-%d"
@@ -43,13 +56,21 @@ class DaterangeField(StringField):
                 today - datetime.timedelta(days=self.default_days), today)
         super().__init__(label, validators_, **kwargs)
 
+    def _parse_date(self, value) -> datetime.date:
+        # fromisoformat() is much faster than strptime() for the usual
+        # YYYY-MM-DD. Since Python 3.11 it also accepts other ISO 8601 forms
+        # such as 20200105, hence the pattern check. strptime() also accepts
+        # dates without zero padding.
+        if _date_fromisoformat is not None and RE_ISO_DATE.match(value):
+            return _date_fromisoformat(value)
+
+        return datetime.datetime.strptime(value, self.date_format).date()
+
     def process_formdata(self, valuelist) -> None:
         if valuelist:
             s = valuelist[0].split(self.separator)
             if len(s) == 2:
-                self.data = (
-                    datetime.datetime.strptime(s[0], self.date_format).date(),
-                    datetime.datetime.strptime(s[1], self.date_format).date())
+                self.data = (self._parse_date(s[0]), self._parse_date(s[1]))
 
                 return
 
@@ -76,18 +97,59 @@ class TagListField(StringField):
         return ""
 
     def process_formdata(self, valuelist) -> None:
-        if valuelist:
+        if valuelist and valuelist[0]:
             self.data = [x.strip() for x in valuelist[0].split(",") if x.strip()]
         else:
             self.data = []
 
 
+def _caching_key_part(data) -> str:
+    """
+    Return a stable string representation of form field `data`. Lists are
+    sorted as the order of selected values does not matter, tuples keep
+    their order and database objects are represented by their primary key.
+    """
+
+    if isinstance(data, list):
+        return ",".join(sorted(_caching_key_part(item) for item in data))
+
+    if isinstance(data, tuple):
+        return ",".join(_caching_key_part(item) for item in data)
+
+    if isinstance(data, GenericTable):
+        return data.pkstr()
+
+    if not data:
+        return ""
+
+    return str(data)
+
+
+def form_caching_key(form_name, parts) -> str:
+    """
+    Return a cache key for the form named `form_name` with field values
+    `parts`. The key only needs to be stable, not cryptographically secure.
+    """
+
+    # Feed the fields one by one rather than building one large string.
+    # Most filters are usually empty, only the set ones are hashed together
+    # with their position so that the key stays unambiguous.
+    key = blake2b(form_name.encode("utf-8"), digest_size=16)
+    for i, part in enumerate(parts):
+        value = _caching_key_part(part)
+        if value:
+            key.update("\0{0}={1}".format(i, value).encode("utf-8"))
+
+    return key.hexdigest()
+
+
 def component_list() -> List[Tuple[str, Any]]:
-    sub = (db.session.query(Report.component_id)
-           .filter(Report.component_id == OpSysComponent.id))
-    comps = (db.session.query(OpSysComponent.id, OpSysComponent.name)
-             .filter(sub.exists())
-             .all())
+    # plain Core select, the rows are only (id, name) pairs and do not need
+    # to go through the ORM query machinery
+    comps = db.session.execute(
+        select([OpSysComponent.id, OpSysComponent.name])
+        .where(exists().where(Report.component_id == OpSysComponent.id))
+    ).fetchall()
     merged = defaultdict(list)
     for iden, name in comps:
         merged[name].append(iden)
@@ -103,11 +165,11 @@ def component_names_to_ids(component_names) -> List[int]:
     component_ids = []
     if component_names:
         component_names = [x.strip() for x in component_names.split(",")]
-        if component_names and component_names[0]:
-            component_ids = list(map(itemgetter(0),
-                                     (db.session.query(OpSysComponent.id)
-                                      .filter(OpSysComponent.name.in_(component_names))
-                                      .all())))
+        # split() always returns at least one item
+        if component_names[0]:
+            component_ids = [row[0] for row in db.session.execute(
+                select([OpSysComponent.id])
+                .where(OpSysComponent.name.in_(component_names)))]
 
         # Some components were searched for but non was found in DB
         if not component_ids:
@@ -123,7 +185,7 @@ releases_multiselect = QuerySelectMultipleField(
                            .order_by(OpSysRelease.opsys_id)
                            .order_by(OpSysRelease.version)
                            .all()),
-    get_pk=lambda a: a.id, get_label=lambda a: str(a)) # pylint: disable=unnecessary-lambda
+    get_pk=lambda a: a.id, get_label=str)
 
 
 arch_multiselect = QuerySelectMultipleField(
@@ -131,7 +193,11 @@ arch_multiselect = QuerySelectMultipleField(
     query_factory=lambda: (db.session.query(Arch)
                            .order_by(Arch.name)
                            .all()),
-    get_pk=lambda a: a.id, get_label=lambda a: str(a)) # pylint: disable=unnecessary-lambda
+    get_pk=lambda a: a.id, get_label=str)
+
+
+def taintflag_label(taintflag) -> str:
+    return f"{taintflag.character} {taintflag.ureport_name}"
 
 
 def maintainer_default():
@@ -148,7 +214,7 @@ associate_select = QuerySelectField(
     query_factory=lambda: (db.session.query(AssociatePeople)
                            .order_by(asc(AssociatePeople.name))
                            .all()),
-    get_pk=lambda a: a.id, get_label=lambda a: a.name,
+    get_pk=lambda a: a.id, get_label="name",
     default=maintainer_default)
 
 
@@ -179,7 +245,7 @@ class ProblemFilterForm(Form):
         query_factory=lambda: (db.session.query(KernelTaintFlag)
                                .order_by(KernelTaintFlag.character)
                                .all()),
-        get_pk=lambda a: a.id, get_label=lambda a: "{0} {1}".format(a.character, a.ureport_name))
+        get_pk=lambda a: a.id, get_label=taintflag_label)
 
     function_names = TagListField()
     binary_names = TagListField()
@@ -199,7 +265,7 @@ class ProblemFilterForm(Form):
                                .filter(OpSysRelease.status != "EOL")
                                .order_by(OpSysRelease.releasedate)
                                .all()),
-        get_pk=lambda a: a.id, get_label=lambda a: str(a)) # pylint: disable=unnecessary-lambda
+        get_pk=lambda a: a.id, get_label=str)
 
     bug_filter = SelectField("Bug status", validators=[validators.Optional()],
                              choices=[
@@ -211,28 +277,24 @@ class ProblemFilterForm(Form):
                              ])
 
     def caching_key(self) -> str:
-        associate = ()
-        if self.associate.data:
-            associate = (self.associate.data)
-
-        return sha1(("ProblemFilterForm" + str((
-            associate,
-            tuple(self.arch.data or []),
-            tuple(self.type.data or []),
-            tuple(self.exclude_taintflags.data or []),
-            tuple(sorted(self.component_names.data or [])),
-            tuple(self.daterange.data or []),
-            tuple(sorted(self.opsysreleases.data or [])),
-            tuple(sorted(self.function_names.data or [])),
-            tuple(sorted(self.binary_names.data or [])),
-            tuple(sorted(self.source_file_names.data or [])),
-            tuple(sorted(self.since_version.data or [])),
-            tuple(sorted(self.since_release.data or [])),
-            tuple(sorted(self.to_version.data or [])),
-            tuple(sorted(self.to_release.data or [])),
-            tuple(sorted(self.probable_fix_osrs.data or [])),
-            tuple(sorted(self.bug_filter.data or [])),
-            ))).encode("utf-8")).hexdigest()
+        return form_caching_key("ProblemFilterForm", (
+            self.associate.data,
+            self.arch.data,
+            self.type.data,
+            self.exclude_taintflags.data,
+            self.component_names.data,
+            self.daterange.data,
+            self.opsysreleases.data,
+            self.function_names.data,
+            self.binary_names.data,
+            self.source_file_names.data,
+            self.since_version.data,
+            self.since_release.data,
+            self.to_version.data,
+            self.to_release.data,
+            self.probable_fix_osrs.data,
+            self.bug_filter.data,
+            ))
 
 
 class ReportFilterForm(Form):
@@ -260,18 +322,14 @@ class ReportFilterForm(Form):
                            default="last_occurrence")
 
     def caching_key(self) -> str:
-        associate = ()
-        if self.associate.data:
-            associate = (self.associate.data)
-
-        return sha1(("ReportFilterForm" + str((
-            associate,
-            tuple(self.arch.data or []),
-            tuple(self.type.data or []),
-            tuple(sorted(self.component_names.data or [])),
-            tuple(self.daterange.data or []),
-            tuple(self.order_by.data or []),
-            tuple(sorted(self.opsysreleases.data or []))))).encode("utf-8")).hexdigest()
+        return form_caching_key("ReportFilterForm", (
+            self.associate.data,
+            self.arch.data,
+            self.type.data,
+            self.component_names.data,
+            self.daterange.data,
+            self.order_by.data,
+            self.opsysreleases.data))
 
 
 class SummaryForm(Form):
@@ -290,11 +348,11 @@ class SummaryForm(Form):
                              default="d")
 
     def caching_key(self) -> str:
-        return sha1(("SummaryForm" + str((
-            tuple(self.resolution.data or []),
-            tuple(sorted(self.component_names.data or [])),
-            tuple(self.daterange.data or []),
-            tuple(sorted(self.opsysreleases.data or []))))).encode("utf-8")).hexdigest()
+        return form_caching_key("SummaryForm", (
+            self.resolution.data,
+            self.component_names.data,
+            self.daterange.data,
+            self.opsysreleases.data))
 
 
 class BacktraceDiffForm(Form):
@@ -319,14 +377,14 @@ class BugIdField(StringField):
 
     def process_formdata(self, valuelist) -> None:
         if valuelist:
-            for value in valuelist:
-                try:
-                    self.data = int(value)
-                except ValueError as ex:
-                    m = re.search(r"id=(\d+)", value)
-                    if m is None:
-                        raise validators.ValidationError("Invalid Bug ID") from ex
-                    self.data = int(m.group(1))
+            value = valuelist[0]
+            try:
+                self.data = int(value)
+            except ValueError as ex:
+                m = RE_BUG_ID.search(value)
+                if m is None:
+                    raise validators.ValidationError("Invalid Bug ID") from ex
+                self.data = int(m.group(1))
         else:
             self.data = None
 
@@ -799,7 +799,9 @@ def new() -> Union[Dict[str, bool], Tuple[str, int], str, Response]:
 
             max_ureport_length = InvalidUReport.__lobs__["ureport"]
 
-            if len(str(report)) > max_ureport_length:
+            # measure the upload itself, str(report) would build a copy
+            # of the whole uReport just to get its length
+            if len(raw_data) > max_ureport_length:
                 raise InvalidUsage("uReport may only be {0} bytes long"
                                    .format(max_ureport_length), 413)
 
@@ -954,11 +956,9 @@ def attach() -> Union[Tuple[str, int], str, Response]:
             except Exception as ex:
                 raise InvalidUsage("Validation failed: %s" % ex, 400) from ex
 
-            attachment = data
-
             max_attachment_length = 2048
 
-            if len(str(attachment)) > max_attachment_length:
+            if len(raw_data) > max_attachment_length:
                 err = "uReport attachment may only be {0} bytes long" \
                       .format(max_attachment_length)
                 raise InvalidUsage(err, 413)
@@ -1,10 +1,12 @@
 #!/usr/bin/python3
 # -*- encoding: utf-8 -*-
+import re
 import unittest
 import logging
 
 import faftests
 from pyfaf.storage import *
+from pyfaf.solutionfinders.prefilter_solution_finder import PrefilterSolutionFinder
 from datetime import datetime
 from sqlalchemy import desc
 
@@ -65,6 +67,37 @@ class FindReportSolutionTestCase(faftests.DatabaseCase):
         self.assertEqual(report.max_certainty, 100)
         self.assertEqual(probably_fix_report.max_certainty, 99)
 
+    def test_combined_parser(self):
+        finder = PrefilterSolutionFinder()
+
+        combined = finder._get_combined_parser([re.compile(r"^will-crash-"),
+                                                re.compile(r"^bar")])
+        self.assertIsNotNone(combined.match("will-crash-0.9-1.el7.x86_64"))
+        self.assertIsNone(combined.match("foo-1-1.el7.x86_64"))
+
+        # groups and inline flags do not survive joining the patterns
+        self.assertIsNone(finder._get_combined_parser(
+            [re.compile(r"^(\w+)-\1-"), re.compile(r"^(bar)")]))
+        self.assertIsNone(finder._get_combined_parser(
+            [re.compile(r"(?x) ^foo"), re.compile(r"^bar baz")]))
+        self.assertIsNone(finder._get_combined_parser([re.compile(r"^foo")]))
+
+    def test_solution_backreference(self):
+        sps = SfPrefilterSolution(cause="will-crash",
+                                  note_text="will-crash is an artificial crash")
+        self.db.session.add(sps)
+        self.db.session.add(SfPrefilterPackageName(pattern=r"^wi(l)\1-crash-",
+                                                   solution=sps))
+        self.db.session.add(SfPrefilterPackageName(pattern=r"^(bar)",
+                                                   solution=sps))
+        self.db.session.flush()
+
+        ureport = self.load_report("ureport_solution")
+        solution = PrefilterSolutionFinder().find_solution_ureport(self.db,
+                                                                  ureport)
+        self.assertIsNotNone(solution)
+        self.assertEqual(solution.cause, "will-crash")
+
 
 if __name__ == "__main__":
     logging.basicConfig(level=logging.ERROR)
@@ -6,10 +6,17 @@ import logging
 import faftests
 
 from pyfaf.storage.opsys import Arch, Build, Package, OpSys, OpSysComponent
-from pyfaf.storage.report import ReportUnknownPackage, Report
+from pyfaf.storage.report import ReportPackage, ReportUnknownPackage, Report
 from pyfaf.storage.problem import Problem
-from pyfaf.queries import (get_packages_and_their_reports_unknown_packages,
+from pyfaf.storage.symbol import Symbol, SymbolSource
+from pyfaf.queries import (get_archs_by_names,
+                           get_packages_and_their_reports_unknown_packages,
+                           get_packages_by_nevras,
+                           get_reportpackages_bulk,
+                           get_ssources_by_bpos,
+                           get_symbols_by_name_paths,
                            get_unassigned_reports,
+                           get_unknown_packages_bulk,
                            unassign_reports)
 
 
@@ -185,6 +192,214 @@ class QueriesTestCase(faftests.DatabaseCase):
         self.assertIn(
             (pkg2, report_unknown2), packages_and_their_reports_unknown_packages)
 
+    def test_get_packages_by_nevras(self):
+        """
+        """
+
+        arch = Arch()
+        arch.name = "noarch"
+        self.db.session.add(arch)
+
+        build = Build()
+        build.base_package_name = "sample"
+        build.version = "1"
+        build.release = "1"
+        build.epoch = 0
+        self.db.session.add(build)
+
+        pkg = Package()
+        pkg.name = "sample"
+        pkg.pkgtype = "rpm"
+        pkg.arch = arch
+        pkg.build = build
+        self.db.session.add(pkg)
+
+        self.db.session.flush()
+
+        packages = get_packages_by_nevras(self.db, [
+            ("sample", 0, "1", "1", "noarch"),
+            ("sample", 0, "1", "2", "noarch"),
+            ("sample", 0, "1", "1", "x86_64"),
+        ])
+        self.assertEqual(packages, {("sample", 0, "1", "1", "noarch"): pkg})
+        self.assertEqual(get_packages_by_nevras(self.db, []), {})
+
+    def test_get_archs_by_names(self):
+        """
+        """
+
+        self.basic_fixtures()
+
+        archs = get_archs_by_names(self.db, ["noarch", "x86_64", "x86_64",
+                                             "nonsense"])
+        self.assertEqual(archs, {"noarch": self.arch_noarch,
+                                 "x86_64": self.arch_x86_64})
+        self.assertEqual(get_archs_by_names(self.db, []), {})
+
+    def test_get_reportpackages_bulk(self):
+        """
+        """
+
+        self.basic_fixtures()
+
+        build = Build()
+        build.base_package_name = "sample"
+        build.version = "1"
+        build.release = "1"
+        build.epoch = 0
+        self.db.session.add(build)
+
+        pkg = Package()
+        pkg.name = "sample"
+        pkg.pkgtype = "rpm"
+        pkg.arch = self.arch_noarch
+        pkg.build = build
+        self.db.session.add(pkg)
+
+        pkg2 = Package()
+        pkg2.name = "sample"
+        pkg2.pkgtype = "rpm"
+        pkg2.arch = self.arch_x86_64
+        pkg2.build = build
+        self.db.session.add(pkg2)
+
+        report = Report()
+        report.type = "core"
+        report.count = 1
+        report.component = self.comp_faf
+        self.db.session.add(report)
+
+        other_report = Report()
+        other_report.type = "core"
+        other_report.count = 1
+        other_report.component = self.comp_systemd
+        self.db.session.add(other_report)
+
+        report_package = ReportPackage()
+        report_package.report = report
+        report_package.type = "CRASHED"
+        report_package.installed_package = pkg
+        report_package.count = 1
+        self.db.session.add(report_package)
+
+        other_report_package = ReportPackage()
+        other_report_package.report = other_report
+        other_report_package.type = "CRASHED"
+        other_report_package.installed_package = pkg2
+        other_report_package.count = 1
+        self.db.session.add(other_report_package)
+
+        self.db.session.flush()
+
+        report_packages = get_reportpackages_bulk(self.db, report,
+                                                  [pkg.id, pkg2.id, pkg.id])
+        self.assertEqual(report_packages, {pkg.id: report_package})
+        self.assertEqual(get_reportpackages_bulk(self.db, report, []), {})
+        self.assertEqual(get_reportpackages_bulk(self.db, Report(), [pkg.id]),
+                         {})
+
+    def test_get_unknown_packages_bulk(self):
+        """
+        """
+
+        self.basic_fixtures()
+
+        report = Report()
+        report.type = "core"
+        report.count = 1
+        report.component = self.comp_faf
+        self.db.session.add(report)
+
+        unknown_packages = []
+        for role, arch in [("CRASHED", self.arch_noarch),
+                           ("RELATED", self.arch_noarch),
+                           ("CRASHED", self.arch_x86_64)]:
+            report_unknown = ReportUnknownPackage()
+            report_unknown.report = report
+            report_unknown.type = role
+            report_unknown.name = "sample"
+            report_unknown.epoch = 0
+            report_unknown.version = "1"
+            report_unknown.release = "1"
+            report_unknown.semver = "1.0.0"
+            report_unknown.semrel = "1.0.0"
+            report_unknown.arch = arch
+            report_unknown.count = 1
+            self.db.session.add(report_unknown)
+            unknown_packages.append(report_unknown)
+
+        self.db.session.flush()
+
+        found = get_unknown_packages_bulk(self.db, report, [
+            ("sample", 0, "1", "1", "noarch"),
+            ("sample", 0, "1", "2", "x86_64"),
+            ("nonsense", 0, "1", "1", "noarch"),
+        ])
+        self.assertEqual(found, {
+            ("CRASHED", "sample", 0, "1", "1", "noarch"): unknown_packages[0],
+            ("RELATED", "sample", 0, "1", "1", "noarch"): unknown_packages[1],
+        })
+        self.assertEqual(get_unknown_packages_bulk(self.db, report, []), {})
+
+    def test_get_ssources_by_bpos(self):
+        """
+        """
+
+        ssource = SymbolSource()
+        ssource.build_id = "abcd"
+        ssource.path = "/usr/bin/sample"
+        ssource.offset = 10
+        self.db.session.add(ssource)
+
+        ssource_no_build_id = SymbolSource()
+        ssource_no_build_id.build_id = None
+        ssource_no_build_id.path = "/usr/bin/sample"
+        ssource_no_build_id.offset = 20
+        self.db.session.add(ssource_no_build_id)
+
+        self.db.session.flush()
+
+        ssources = get_ssources_by_bpos(self.db, [
+            ("abcd", "/usr/bin/sample", 10),
+            (None, "/usr/bin/sample", 20),
+            (None, "/usr/bin/sample", 20),
+            # path and offset match, the build id does not
+            ("efgh", "/usr/bin/sample", 10),
+            (None, "/usr/bin/sample", 10),
+            ("abcd", "/usr/bin/sample", 20),
+        ])
+        self.assertEqual(ssources, {
+            ("abcd", "/usr/bin/sample", 10): ssource,
+            (None, "/usr/bin/sample", 20): ssource_no_build_id,
+        })
+        self.assertEqual(get_ssources_by_bpos(self.db, []), {})
+
+    def test_get_symbols_by_name_paths(self):
+        """
+        """
+
+        symbol = Symbol()
+        symbol.name = "main"
+        symbol.normalized_path = "/usr/bin/sample"
+        self.db.session.add(symbol)
+
+        symbol2 = Symbol()
+        symbol2.name = "main"
+        symbol2.normalized_path = "/usr/bin/other"
+        self.db.session.add(symbol2)
+
+        self.db.session.flush()
+
+        symbols = get_symbols_by_name_paths(self.db, [
+            ("main", "/usr/bin/sample"),
+            ("main", "/usr/bin/sample"),
+            ("main", "/usr/bin/other"),
+            ("exit", "/usr/bin/sample"),
+        ])
+        self.assertEqual(symbols, {("main", "/usr/bin/sample"): symbol,
+                                   ("main", "/usr/bin/other"): symbol2})
+        self.assertEqual(get_symbols_by_name_paths(self.db, []), {})
+
 
 if __name__ == "__main__":
     logging.basicConfig(level=logging.INFO)
@@ -2,11 +2,13 @@
 # -*- encoding: utf-8 -*-
 import os
 import logging
+import types
 import unittest
 
 import faftests
+import pyfaf.retrace
 from pyfaf.common import FafError
-from pyfaf.retrace import addr2line
+from pyfaf.retrace import addr2line, addr2line_batch, demangle
 
 
 class RetraceTestCase(faftests.TestCase):
@@ -68,6 +70,61 @@ class RetraceTestCase(faftests.TestCase):
         self.assertEqual(f, "Source/WTF/wtf/MessageQueue.c")
         self.assertEqual(l, 1234)
 
+    def test_addr2line_batch(self):
+        results = addr2line_batch("last_chance",
+                                  [int("0x3", 16), int("0xf", 16), 0,
+                                   int("0x3", 16)], "debug")
+        self.assertEqual(len(results), 3)
+        self.assertEqual(results[int("0x3", 16)],
+                         [("last_chance", "last_chance.c", 2)])
+        self.assertEqual(results[int("0xf", 16)],
+                         [("last_chance", "last_chance.c", 2)])
+        self.assertIsInstance(results[0], FafError)
+        self.assertEqual(str(results[0]),
+                         "eu-addr2line cannot find function name")
+
+    def test_addr2line_batch_unexpected_output(self):
+        results = addr2line_batch("malformed", [1, 2], "debug")
+        self.assertEqual(results[1], [("malformed", "malformed.c", 7)])
+        self.assertIsInstance(results[2], FafError)
+        self.assertEqual(str(results[2]), "Unexpected output from "
+                         "eu-addr2line: 'malformed.c:seven'")
+
+        results = addr2line_batch("truncated", [1, 2], "debug")
+        self.assertEqual(results[1], [("truncated", "truncated.c", 7)])
+        self.assertIsInstance(results[2], FafError)
+        self.assertEqual(str(results[2]),
+                         "Unexpected output from eu-addr2line for 0x2")
+
+    def test_demangle_cache(self):
+        calls = []
+
+        def failing_popen(*args, **kwargs):
+            calls.append(args)
+            return None
+
+        def working_popen(*args, **kwargs):
+            calls.append(args)
+            return types.SimpleNamespace(stdout="test_demangle_cache()\n")
+
+        safe_popen = pyfaf.retrace.safe_popen
+        try:
+            # failures are retried
+            pyfaf.retrace.safe_popen = failing_popen
+            self.assertIsNone(demangle("_Z19test_demangle_cachev"))
+            self.assertIsNone(demangle("_Z19test_demangle_cachev"))
+            self.assertEqual(len(calls), 2)
+
+            # successful results are cached
+            pyfaf.retrace.safe_popen = working_popen
+            self.assertEqual(demangle("_Z19test_demangle_cachev"),
+                             "test_demangle_cache()")
+            self.assertEqual(demangle("_Z19test_demangle_cachev"),
+                             "test_demangle_cache()")
+            self.assertEqual(len(calls), 3)
+        finally:
+            pyfaf.retrace.safe_popen = safe_popen
+
 
 if __name__ == "__main__":
     logging.basicConfig(level=logging.INFO)
@@ -16,7 +16,12 @@ from pyfaf.ureport import (attachment_type_allowed,
                            validate,
                            validate_attachment)
 
-from pyfaf.storage.report import Report, ContactEmail
+from pyfaf.opsys import systems
+from pyfaf.storage.opsys import Build, Package
+from pyfaf.storage.report import (Report,
+                                  ContactEmail,
+                                  ReportPackage,
+                                  ReportUnknownPackage)
 from pyfaf.storage.bugtracker import Bugtracker
 from pyfaf.storage.bugzilla import BzBug, BzUser
 
@@ -102,6 +107,85 @@ class UreportTestCase(faftests.DatabaseCase):
         for report_name in self.sample_report_names:
             save(self.db, self.sample_reports[report_name])
 
+    def test_centos_package_counts(self):
+        """
+        Check that the CentOS plugin counts new and existing report packages
+        and unknown packages.
+        """
+
+        build = Build()
+        build.base_package_name = "sample"
+        build.version = "1"
+        build.release = "1"
+        build.epoch = 0
+        self.db.session.add(build)
+
+        pkg = Package()
+        pkg.name = "sample"
+        pkg.pkgtype = "rpm"
+        pkg.arch = self.arch_noarch
+        pkg.build = build
+        self.db.session.add(pkg)
+
+        report = Report()
+        report.component = self.comp_faf
+        report.count = 1
+        report.type = "core"
+        self.db.session.add(report)
+
+        known = {"name": "sample", "epoch": 0, "version": "1", "release": "1",
+                 "architecture": "noarch"}
+        unknown = {"name": "missing", "epoch": 0, "version": "2",
+                   "release": "3.el8", "architecture": "x86_64"}
+        # related first, the affected package must get its own row anyway
+        packages = [dict(known),
+                    dict(known, package_role="affected"),
+                    dict(known, package_role="affected"),
+                    dict(unknown, package_role="affected"),
+                    dict(unknown)]
+
+        centos = systems["centos"]
+
+        # the report is not flushed yet, all rows are new
+        centos.save_ureport(self.db, report, {}, packages)
+        self.db.session.flush()
+
+        db_reportpackages = (self.db.session.query(ReportPackage)
+                             .filter(ReportPackage.report == report)
+                             .all())
+        self.assertEqual({db_reportpackage.installed_package
+                          for db_reportpackage in db_reportpackages}, {pkg})
+        self.assertEqual({db_reportpackage.type: db_reportpackage.count
+                          for db_reportpackage in db_reportpackages},
+                         {"CRASHED": 2, "RELATED": 1})
+
+        db_unknown_pkgs = {db_unknown_pkg.type: db_unknown_pkg.count
+                           for db_unknown_pkg in
+                           (self.db.session.query(ReportUnknownPackage)
+                            .filter(ReportUnknownPackage.report == report)
+                            .filter(ReportUnknownPackage.name == "missing"))}
+        self.assertEqual(db_unknown_pkgs, {"CRASHED": 1, "RELATED": 1})
+
+        # the same packages again, all rows exist now
+        centos.save_ureport(self.db, report, {}, packages, count=2)
+        self.db.session.flush()
+        self.db.session.expire_all()
+
+        # an existing row of the package is reused regardless of its role
+        db_reportpackages = (self.db.session.query(ReportPackage)
+                             .filter(ReportPackage.report == report)
+                             .all())
+        self.assertEqual(len(db_reportpackages), 2)
+        self.assertEqual(sum(db_reportpackage.count
+                             for db_reportpackage in db_reportpackages), 9)
+
+        db_unknown_pkgs = {db_unknown_pkg.type: db_unknown_pkg.count
+                           for db_unknown_pkg in
+                           (self.db.session.query(ReportUnknownPackage)
+                            .filter(ReportUnknownPackage.report == report)
+                            .filter(ReportUnknownPackage.name == "missing"))}
+        self.assertEqual(db_unknown_pkgs, {"CRASHED": 3, "RELATED": 3})
+
     def test_attachment_validation(self):
         """
         Check if attachment validation works correctly.
@@ -0,0 +1,104 @@
+#!/usr/bin/python3
+# -*- encoding: utf-8 -*-
+import datetime
+import unittest
+
+from werkzeug.datastructures import MultiDict
+from wtforms import Form
+
+from webfaftests import WebfafTestCase
+from pyfaf.storage import OpSysComponent
+from webfaf.forms import DaterangeField, form_caching_key
+
+
+class DaterangeForm(Form):
+    daterange = DaterangeField(default_days=None)
+
+
+class FormsTestCase(WebfafTestCase):
+    """
+    Tests for webfaf.forms
+    """
+
+    def process_daterange(self, value):
+        return DaterangeForm(MultiDict({"daterange": value})).daterange
+
+    def test_daterange(self):
+        """
+        Zero padded and unpadded dates are accepted
+        """
+
+        expected = (datetime.date(2020, 1, 5), datetime.date(2020, 11, 6))
+
+        field = self.process_daterange("2020-01-05:2020-11-06")
+        self.assertEqual(field.data, expected)
+        self.assertEqual(field.process_errors, [])
+        self.assertEqual(field._value(), "2020-01-05:2020-11-06")
+
+        field = self.process_daterange("2020-1-5:2020-11-6")
+        self.assertEqual(field.data, expected)
+        self.assertEqual(field.process_errors, [])
+
+    def test_daterange_invalid(self):
+        """
+        Other ISO 8601 forms and invalid dates are rejected
+        """
+
+        for value in ["2020-13-05:2020-11-06",
+                      "20200105:20201106",
+                      "2020-W01-1:2020-W45-5",
+                      "yesterday:today"]:
+            field = self.process_daterange(value)
+            self.assertIsNone(field.data)
+            self.assertNotEqual(field.process_errors, [])
+
+        self.assertIsNone(self.process_daterange("2020-01-05").data)
+
+    def test_caching_key(self):
+        """
+        Different field values give different keys
+        """
+
+        self.assertNotEqual(form_caching_key("TestForm", ("1.2",)),
+                            form_caching_key("TestForm", ("2.1",)))
+
+        # the order of selected values does not matter
+        self.assertEqual(form_caching_key("TestForm", (["a", "b"], "c")),
+                         form_caching_key("TestForm", (["b", "a"], "c")))
+
+        # empty fields are skipped, but the position of the others counts
+        self.assertNotEqual(form_caching_key("TestForm", ("a", None, [])),
+                            form_caching_key("TestForm", (None, "a", [])))
+        self.assertNotEqual(form_caching_key("TestForm", ("a", "")),
+                            form_caching_key("TestForm", ("", "a")))
+
+        self.assertNotEqual(form_caching_key("TestForm", ("a",)),
+                            form_caching_key("OtherForm", ("a",)))
+
+    def test_caching_key_db_objects(self):
+        """
+        Database objects are identified by their primary key
+        """
+
+        self.basic_fixtures()
+        self.db.session.flush()
+
+        comp_id = self.comp_faf.id
+        other_id = self.comp_systemd.id
+        self.db.session.expunge_all()
+
+        comp = self.db.session.query(OpSysComponent).get(comp_id)
+        other = self.db.session.query(OpSysComponent).get(other_id)
+        key = form_caching_key("TestForm", ([comp, other],))
+        self.db.session.expunge_all()
+
+        comp_again = self.db.session.query(OpSysComponent).get(comp_id)
+        other_again = self.db.session.query(OpSysComponent).get(other_id)
+        self.assertIsNot(comp, comp_again)
+        self.assertEqual(form_caching_key("TestForm",
+                                          ([other_again, comp_again],)), key)
+        self.assertNotEqual(form_caching_key("TestForm", ([comp_again],)), key)
+
+
+if __name__ == "__main__":
+    unittest.main()